@@ -14,7 +14,7 @@ from linebot.models import (
 from linebot.exceptions import LineBotApiError
 
 from handlers.logic_handler import handle_user_message
-from handlers.session_manager import get_user_session
+from handlers.session_manager import get_session_and_lock
 from utils.logging import log_chat
 from services.gemini_service import references_to_flex
 from services.stt_service import transcribe_audio_file
@@ -37,14 +37,43 @@ def handle_line_message(event: MessageEvent) -> None:
         user_id = event.source.user_id
         user_input = event.message.text
         
-        # Get session and process message
-        session = get_user_session(user_id)
-        reply_text, gemini_called, quick_reply_data = handle_user_message(
-            user_id, user_input, session
-        )
-        
-        # Create response bubbles
-        bubbles = create_message_bubbles(session, reply_text, quick_reply_data, gemini_called)
+        # Get session and process message (webhooks run concurrently in
+        # worker threads, so serialize messages from the same user)
+        session, session_lock = get_session_and_lock(user_id)
+        with session_lock:
+            reply_text, gemini_called, quick_reply_data = handle_user_message(
+                user_id, user_input, session
+            )
+            
+            # Create response bubbles
+            bubbles = create_message_bubbles(session, reply_text, quick_reply_data)
+            
+            # Work out what to log while still holding the lock, so a second
+            # message from the same user can't change the session first
+            # (skip for chat mode to avoid duplicates)
+            should_log = session.get("mode") != "chat"
+            if should_log:
+                # Include context in user input for logging
+                logged_input = user_input
+                action_type = "sync reply"
+                email_r2_url = None
+                
+                if session.get("awaiting_translate_language") or session.get("awaiting_chat_language"):
+                    # This input was a language selection
+                    logged_input = f"[Language: {user_input}] {user_input}"
+                elif session.get("awaiting_email") or "email_r2_url" in session:
+                    # This input was an email address (or we just sent an email)
+                    logged_input = f"[Email to: {user_input}]"
+                    action_type = "Email sent" if "成功寄出" in reply_text else "Email failed"
+                    
+                    # Check if we have R2 URL from email upload
+                    email_r2_url = session.pop("email_r2_url", None)
+                
+                if gemini_called:
+                    action_type = "Gemini reply"
+                
+                # Snapshot; the entry is logged after the lock is released
+                log_session = dict(session)
         
         # Send response with final validation
         if bubbles:
@@ -63,44 +92,16 @@ def handle_line_message(event: MessageEvent) -> None:
                     TextSendMessage(text="系統錯誤：訊息內容過長，請嘗試較短的查詢。")
                 )
         
-        # Log interaction (skip for chat mode to avoid duplicates)
-        if session.get("mode") != "chat":
-            # Include context in user input for logging
-            logged_input = user_input
-            action_type = "sync reply"
-            email_r2_url = None
-            
-            if session.get("awaiting_translate_language") or session.get("awaiting_chat_language"):
-                # This input was a language selection
-                logged_input = f"[Language: {user_input}] {user_input}"
-            elif session.get("awaiting_email") or "email_r2_url" in session:
-                # This input was an email address (or we just sent an email)
-                logged_input = f"[Email to: {user_input}]"
-                action_type = "Email sent" if "成功寄出" in reply_text else "Email failed"
-                
-                # Check if we have R2 URL from email upload
-                email_r2_url = session.pop("email_r2_url", None)
-                if email_r2_url:
-                    # Found email R2 URL for logging
-                    pass
-            
-            if gemini_called:
-                action_type = "Gemini reply"
-            
-            # Use email R2 URL if available, otherwise use regular gemini URL logic
-            gemini_url = None
-            if email_r2_url:
-                gemini_url = email_r2_url
-                # Using email R2 URL for logging
-                
+        # Log interaction
+        if should_log:
             log_chat(
                 user_id,
                 logged_input,
                 reply_text[:200],
-                session,
+                log_session,
                 action_type=action_type,
                 gemini_call="yes" if gemini_called else "no",
-                gemini_output_url=gemini_url
+                gemini_output_url=email_r2_url
             )
     
     except Exception as e:
@@ -114,7 +115,7 @@ def handle_audio_message(event: MessageEvent) -> None:
     """Handle incoming audio messages (voicemail feature)"""
     user_id = event.source.user_id
     message_id = event.message.id
-    session = get_user_session(user_id)
+    session, session_lock = get_session_and_lock(user_id)
     
     # Only allow audio in chat mode after language is selected
     if session.get("mode") != "chat" or not session.get("chat_target_lang"):
@@ -146,13 +147,14 @@ def handle_audio_message(event: MessageEvent) -> None:
         
         # Process transcription exactly like text input through medchat
         from handlers.medchat_handler import handle_medchat
-        reply_text, gemini_called, quick_reply_data = handle_medchat(user_id, transcription, session)
-        
-        # Add voicemail indicator to show it came from voice
-        response_text = f"🎤 語音訊息：\n{transcription}\n\n{reply_text}"
-        
-        # Create response bubbles
-        bubbles = create_message_bubbles(session, response_text, quick_reply_data, gemini_called)
+        with session_lock:
+            reply_text, _, quick_reply_data = handle_medchat(user_id, transcription, session)
+            
+            # Add voicemail indicator to show it came from voice
+            response_text = f"🎤 語音訊息：\n{transcription}\n\n{reply_text}"
+            
+            # Create response bubbles
+            bubbles = create_message_bubbles(session, response_text, quick_reply_data)
         
         # Send response
         if bubbles:
@@ -165,7 +167,7 @@ def handle_audio_message(event: MessageEvent) -> None:
             TextSendMessage(text="語音處理失敗。")
         )
 
-def create_message_bubbles(session: dict, reply_text: str, quick_reply_data: Optional[dict], gemini_called: bool) -> List:
+def create_message_bubbles(session: dict, reply_text: str, quick_reply_data: Optional[dict]) -> List:
     """Create message bubbles based on session state"""
     bubbles = []
     
@@ -174,6 +176,9 @@ def create_message_bubbles(session: dict, reply_text: str, quick_reply_data: Opt
     
     # Check if we need to show Taigi credit with audio
     show_taigi_credit = session.pop("show_taigi_credit", False)
+    # Set by the edu handlers whenever new content was produced, whether it
+    # came from Gemini or from a cache
+    show_edu_content = session.pop("show_edu_content", False)
     
     # Handle TTS audio with credit for Taigi
     if session.get("tts_audio_url") and show_taigi_credit:
@@ -201,8 +206,8 @@ def create_message_bubbles(session: dict, reply_text: str, quick_reply_data: Opt
                 )
             )
         
-        # Education mode content - only show when Gemini was actually called
-        elif session.get("mode") == "edu" and gemini_called:
+        # Education mode content - only show when new content was produced
+        elif session.get("mode") == "edu" and show_edu_content:
             # Education mode - handling content sections
             # Only show content bubbles when new content is generated
             zh_content = session.get("zh_output", "")
@@ -255,7 +260,7 @@ def create_message_bubbles(session: dict, reply_text: str, quick_reply_data: Opt
                 pass
     
     # Add references only when showing edu content (new generation, modify, or translate)
-    if session.get("mode") == "edu" and gemini_called:
+    if session.get("mode") == "edu" and show_edu_content:
         refs = session.get("references", [])
         if refs:
             flex = references_to_flex(refs)
@@ -1,29 +1,86 @@
 """
 Message Logic Handler - Processes user messages and determines responses
 """
-from typing import Tuple, Optional, Dict, List
-import re
-import dns.resolver
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple, Optional, Dict, List
 
 from services.tts_service import synthesize
 from services.gemini_service import (
-    call_zh, call_translate, plainify, confirm_translate, get_references
+    call_zh, call_translate, plainify, confirm_translate, is_error_reply
 )
 from services.taigi_service import translate_to_taigi, synthesize_taigi
 from services.prompt_config import modify_prompt
 from handlers.mail_handler import send_last_txt_email
 from handlers.medchat_handler import handle_medchat
 from utils.validators import sanitize_text, validate_email
-from utils.language_utils import normalize_language_input
+from utils.language_utils import normalize_language_input, TAIGI_LANGS
+from utils.ttl_cache import TTLCache
 from utils.command_sets import (
     new_commands, edu_commands, chat_commands, modify_commands,
     translate_commands, mail_commands, speak_commands,
-    create_quick_reply_items, MODE_SELECTION_OPTIONS,
+    MODE_SELECTION_OPTIONS,
     COMMON_LANGUAGES, EDU_LANGUAGES, COMMON_DISEASES, TTS_OPTIONS,
     CHAT_CONTINUE_OPTIONS
 )
 from utils.quick_reply_templates import QuickReplyTemplates
 
+__all__ = ["handle_user_message"]
+
+# ============================================================
+# QUICK REPLIES
+# ============================================================
+
+# Fixed button sets are built once at import; LINE's QuickReply copies the
+# items when a reply is sent, so these are shared across requests
+QR_START = QuickReplyTemplates.create('START')
+QR_NEW_CONVERSATION = QuickReplyTemplates.create('NEW_CONVERSATION')
+QR_MODES = QuickReplyTemplates.create_custom(MODE_SELECTION_OPTIONS)
+QR_DISEASES = QuickReplyTemplates.create_custom(COMMON_DISEASES)
+QR_CHAT_LANGUAGES = QuickReplyTemplates.create_languages('COMMON')
+QR_EDU_LANGUAGES = QuickReplyTemplates.create_languages('EDU')
+QR_CHAT_CONTINUE = QuickReplyTemplates.create_custom(CHAT_CONTINUE_OPTIONS)
+QR_EDU_ACTIONS = QuickReplyTemplates.create('EDU_ACTIONS')
+QR_EDU_ACTIONS_NO_MODIFY = QuickReplyTemplates.create('EDU_ACTIONS_NO_MODIFY')
+QR_EDU_MENU = QuickReplyTemplates.create_custom([
+    ("🆕 開始", "new"),
+    ("✏️ 修改", "modify"),
+    ("🌐 翻譯", "translate"),
+    ("📧 寄送", "mail")
+])
+
+# ============================================================
+# FIXED REPLIES
+# ============================================================
+
+# (reply_text, gemini_called, quick_reply) tuples that never vary are built
+# once and returned as-is
+_REPLY_WELCOME = ("歡迎使用 MedEdBot！請點擊【開始】按鈕開始使用：", False, QR_START)
+_REPLY_CHOOSE_MODE_OR_VOICE = ("請選擇您需要的功能，或直接發送語音訊息：", False, QR_MODES)
+_REPLY_NOT_UNDERSTOOD = ("抱歉，我不太理解您的意思。請點擊【開始】重新選擇功能，或直接發送語音訊息。", False, QR_START)
+_REPLY_CHOOSE_MODE = ("請選擇您需要的功能：", False, QR_MODES)
+_REPLY_EDU_MODE = ("📚 進入衛教模式。請選擇或輸入您想了解的健康主題（如：糖尿病、高血壓等）：\n(AI 生成約需 20 秒，請耐心等候)", False, QR_DISEASES)
+_REPLY_CHAT_MODE = ("💬 進入對話模式。請選擇或輸入您需要的翻譯語言：", False, QR_CHAT_LANGUAGES)
+_REPLY_NO_SPEAK_IN_EDU = ("衛教模式不支援語音朗讀功能。如需使用語音功能，請點擊【新對話】切換至醫療翻譯模式。", False, QR_NEW_CONVERSATION)
+_REPLY_NO_TTS_SOURCE = ("目前沒有可朗讀的翻譯內容。請先進行翻譯後再使用朗讀功能。", False, None)
+_REPLY_NO_ZH_FOR_TAIGI = ("無法找到原始中文內容進行台語語音合成。", False, None)
+_REPLY_TTS_ERROR = ("語音合成時發生錯誤，請稍後再試。", False, None)
+_REPLY_ZH_GENERATED = ("✅ 中文版衛教內容已生成。", True, QR_EDU_ACTIONS)
+_REPLY_ZH_FROM_CACHE = ("✅ 中文版衛教內容已生成。", False, QR_EDU_ACTIONS)
+_REPLY_EDU_MENU = ("請選擇您想執行的操作，或直接輸入健康主題查詢新內容：", False, QR_EDU_MENU)
+_REPLY_NO_ZH_MODIFY = ("目前沒有衛教內容可供修改。請先輸入健康主題產生內容。", False, None)
+_REPLY_ASK_MODIFY = ("✏️ 請描述您想如何修改內容：\n(AI 處理約需 20 秒，請耐心等候)", False, None)
+_REPLY_NO_ZH_TRANSLATE = ("目前沒有衛教內容可供翻譯。請先輸入衛教主題產生內容。", False, None)
+_REPLY_ASK_TRANSLATE_LANG = ("🌐 請選擇或輸入任何您需要的翻譯語言：\n(AI 翻譯約需 20 秒，請耐心等候)", False, QR_EDU_LANGUAGES)
+_REPLY_NO_ZH_MAIL = ("目前沒有衛教內容可供寄送。請先輸入衛教主題產生內容。", False, None)
+_REPLY_ASK_EMAIL = ("📧 請輸入收件人的 email 地址（例如：example@gmail.com）：", False, None)
+_REPLY_MODIFIED = ("✅ 內容已根據您的要求修改。", True, QR_EDU_ACTIONS)
+_REPLY_EMPTY_TRANSLATE_LANG = ("請輸入或選擇您需要的翻譯語言：", False, QR_EDU_LANGUAGES)
+_REPLY_NO_TAIGI_IN_EDU = ("衛教模式不支援台語翻譯。請選擇其他語言，或使用醫療翻譯模式進行台語翻譯。", False, QR_EDU_LANGUAGES)
+_REPLY_MAIL_FAILED = ("郵件寄送失敗。請檢查網路連線後再試一次。", False, None)
+
 # ============================================================
 # MAIN HANDLER
 # ============================================================
@@ -38,92 +95,88 @@ def handle_user_message(
     Returns: (reply_text, gemini_called, quick_reply_data)
     """
     text = text.strip()
-    text_lower = text.lower()
+    # str.lower() already has an ASCII fast path; the only saving left is
+    # not lowercasing free text too long to be any command
+    text_lower = text.lower() if len(text) <= _MAX_COMMAND_LEN else ""
     
     # Store user_id in session for logging
     session["user_id"] = user_id
+    started = session.get("started")
+    mode = session.get("mode")
     
-    # Handle 'new' command
-    if text_lower in new_commands:
-        return handle_new_command(session)
-    
-    # Handle 'speak' command
-    if session.get("started") and text_lower in speak_commands:
-        return handle_speak_command(session, user_id)
+    # Handle commands ('new', 'speak', mode selection)
+    entry = _COMMAND_DISPATCH.get(text_lower)
+    if entry is not None:
+        handler, requires_started, requires_no_mode = entry
+        if (started or not requires_started) and (mode is None or not requires_no_mode):
+            return handler(session, user_id)
     
     # Handle unstarted session
-    if not session.get("started"):
-        quick_reply = QuickReplyTemplates.create('START')
-        return "歡迎使用 MedEdBot！請點擊【開始】按鈕開始使用：", False, quick_reply
+    if not started:
+        return _REPLY_WELCOME
     
     # Handle mode selection
-    if session.get("mode") is None:
-        # Education mode
-        if text_lower in edu_commands:
-            session["mode"] = "edu"
-            quick_reply = {"items": create_quick_reply_items(COMMON_DISEASES)}
-            return "📚 進入衛教模式。請選擇或輸入您想了解的健康主題（如：糖尿病、高血壓等）：\n(AI 生成約需 20 秒，請耐心等候)", False, quick_reply
-        
-        # Chat mode
-        if text_lower in chat_commands:
-            session["mode"] = "chat"
-            session["awaiting_chat_language"] = True
-            quick_reply = QuickReplyTemplates.create_languages('COMMON')
-            return "💬 進入對話模式。請選擇或輸入您需要的翻譯語言：", False, quick_reply
-        
-        # Default
-        quick_reply = {"items": create_quick_reply_items(MODE_SELECTION_OPTIONS)}
-        return "請選擇您需要的功能，或直接發送語音訊息：", False, quick_reply
+    if mode is None:
+        return _REPLY_CHOOSE_MODE_OR_VOICE
     
     # Handle education mode
-    if session.get("mode") == "edu":
+    if mode == "edu":
         return handle_education_mode(session, text, text_lower, user_id)
     
     # Handle chat mode
-    if session.get("mode") == "chat":
+    if mode == "chat":
         return handle_medchat(user_id, text, session)
     
     # Fallback
-    quick_reply = {"items": create_quick_reply_items([("🆕 開始", "new")])}
-    return "抱歉，我不太理解您的意思。請點擊【開始】重新選擇功能，或直接發送語音訊息。", False, quick_reply
+    return _REPLY_NOT_UNDERSTOOD
 
 # ============================================================
 # COMMAND HANDLERS
 # ============================================================
 
-def handle_new_command(session: Dict) -> Tuple[str, bool, Optional[Dict]]:
+def handle_new_command(session: Dict, user_id: str = "unknown") -> Tuple[str, bool, Optional[Dict]]:
     """Reset session and start over"""
     session.clear()
     session["started"] = True
-    quick_reply = QuickReplyTemplates.create_custom(MODE_SELECTION_OPTIONS)
-    return "請選擇您需要的功能：", False, quick_reply
+    return _REPLY_CHOOSE_MODE
+
+def handle_edu_command(session: Dict, user_id: str = "unknown") -> Tuple[str, bool, Optional[Dict]]:
+    """Enter education mode"""
+    session["mode"] = "edu"
+    return _REPLY_EDU_MODE
+
+def handle_chat_command(session: Dict, user_id: str = "unknown") -> Tuple[str, bool, Optional[Dict]]:
+    """Enter chat (medical translation) mode"""
+    session["mode"] = "chat"
+    session["awaiting_chat_language"] = True
+    return _REPLY_CHAT_MODE
 
 def handle_speak_command(session: Dict, user_id: str) -> Tuple[str, bool, Optional[Dict]]:
     """Generate TTS audio"""
-    if session.get("mode") == "edu":
-        quick_reply = {"items": create_quick_reply_items([("🆕 新對話", "new")])}
-        return "衛教模式不支援語音朗讀功能。如需使用語音功能，請點擊【新對話】切換至醫療翻譯模式。", False, quick_reply
+    mode = session.get("mode")
+    if mode == "edu":
+        return _REPLY_NO_SPEAK_IN_EDU
     
     # Check if TTS audio already exists
     if session.get("tts_audio_url"):
-        if session.get("mode") == "chat":
-            quick_reply = {"items": create_quick_reply_items(CHAT_CONTINUE_OPTIONS)}
+        if mode == "chat":
+            quick_reply = QR_CHAT_CONTINUE
         else:
-            quick_reply = {"items": create_quick_reply_items([("🆕 新對話", "new")])}
+            quick_reply = QR_NEW_CONVERSATION
         return "🔊 語音檔已存在", False, quick_reply
     
     tts_source = session.get("translated_output")
     if not tts_source:
-        return "目前沒有可朗讀的翻譯內容。請先進行翻譯後再使用朗讀功能。", False, None
+        return _REPLY_NO_TTS_SOURCE
     
     try:
         # Check if last translation was to Taiwanese
         last_lang = session.get("last_translation_lang", "") or session.get("chat_target_lang", "")
-        if last_lang in ["台語", "臺語", "taiwanese", "taigi"]:
+        if last_lang in TAIGI_LANGS:
             # For Taiwanese, we need the original Chinese text
             zh_source = session.get("zh_output", "")
             if not zh_source:
-                return "無法找到原始中文內容進行台語語音合成。", False, None
+                return _REPLY_NO_ZH_FOR_TAIGI
             url, duration = synthesize_taigi(zh_source, user_id)
             # Set flag to show credit bubble with audio
             session["show_taigi_credit"] = True
@@ -135,14 +188,14 @@ def handle_speak_command(session: Dict, user_id: str) -> Tuple[str, bool, Option
         session["tts_audio_dur"] = duration
         
         # Use continue options for chat mode
-        if session.get("mode") == "chat":
-            quick_reply = {"items": create_quick_reply_items(CHAT_CONTINUE_OPTIONS)}
+        if mode == "chat":
+            quick_reply = QR_CHAT_CONTINUE
         else:
-            quick_reply = {"items": create_quick_reply_items([("🆕 新對話", "new")])}
+            quick_reply = QR_NEW_CONVERSATION
         return "🔊 語音檔已生成", False, quick_reply
     except Exception as e:
         print(f"[TTS] Error during synthesis: {e}")
-        return "語音合成時發生錯誤，請稍後再試。", False, None
+        return _REPLY_TTS_ERROR
 
 
 # ============================================================
@@ -152,75 +205,70 @@ def handle_speak_command(session: Dict, user_id: str) -> Tuple[str, bool, Option
 def handle_education_mode(session: Dict, text: str, text_lower: str, user_id: str) -> Tuple[str, bool, Optional[Dict]]:
     """Handle education mode logic"""
     # Check awaiting states first
-    if session.get("awaiting_modify"):
-        return handle_modify_response(session, text)
-    
-    if session.get("awaiting_translate_language"):
-        return handle_translate_response(session, text, user_id)
-    
-    if session.get("awaiting_email"):
-        return handle_email_response(session, text, user_id)
+    for key, handler in _AWAIT_DISPATCH:
+        if session.get(key):
+            return handler(session, text, user_id)
     
     # Check commands
-    if text_lower in modify_commands:
-        if not session.get("zh_output"):
-            return "目前沒有衛教內容可供修改。請先輸入健康主題產生內容。", False, None
-        session["awaiting_modify"] = True
-        return "✏️ 請描述您想如何修改內容：\n(AI 處理約需 20 秒，請耐心等候)", False, None
-    
-    if text_lower in translate_commands:
-        if not session.get("zh_output"):
-            return "目前沒有衛教內容可供翻譯。請先輸入衛教主題產生內容。", False, None
-        session["awaiting_translate_language"] = True
-        quick_reply = {"items": create_quick_reply_items(EDU_LANGUAGES)}
-        return "🌐 請選擇或輸入任何您需要的翻譯語言：\n(AI 翻譯約需 20 秒，請耐心等候)", False, quick_reply
-    
-    if text_lower in mail_commands:
-        if not session.get("zh_output"):
-            return "目前沒有衛教內容可供寄送。請先輸入衛教主題產生內容。", False, None
-        session["awaiting_email"] = True
-        return "📧 請輸入收件人的 email 地址（例如：example@gmail.com）：", False, None
+    command = _EDU_COMMAND_DISPATCH.get(text_lower)
+    if command is not None:
+        return command(session)
     
     # Generate content if none exists
     if not session.get("zh_output"):
-        zh_content = call_zh(text)
+        zh_content, refs, gemini_called = _generate_zh(text)
         session["zh_output"] = zh_content
         session["last_topic"] = text[:30]
+        session["show_edu_content"] = True
         
         # Clear any previous translation since we have new content
         if "translated_output" in session:
             session.pop("translated_output", None)
             session.pop("last_translation_lang", None)
         
-        # Get initial references for new content
-        refs = get_references()
+        # Initial references for new content
         if refs:
             session["references"] = refs
         
-        quick_reply = QuickReplyTemplates.create('EDU_ACTIONS')
-        return "✅ 中文版衛教內容已生成。", True, quick_reply
+        return _REPLY_ZH_GENERATED if gemini_called else _REPLY_ZH_FROM_CACHE
     
     # Fallback
-    quick_reply = {"items": create_quick_reply_items([
-        ("🆕 開始", "new"),
-        ("✏️ 修改", "modify"),
-        ("🌐 翻譯", "translate"),
-        ("📧 寄送", "mail")
-    ])}
-    return "請選擇您想執行的操作，或直接輸入健康主題查詢新內容：", False, quick_reply
-
-def handle_modify_response(session: Dict, instruction: str) -> Tuple[str, bool, Optional[Dict]]:
+    return _REPLY_EDU_MENU
+
+def handle_modify_command(session: Dict) -> Tuple[str, bool, Optional[Dict]]:
+    """Ask for modification instructions"""
+    if not session.get("zh_output"):
+        return _REPLY_NO_ZH_MODIFY
+    session["awaiting_modify"] = True
+    return _REPLY_ASK_MODIFY
+
+def handle_translate_command(session: Dict) -> Tuple[str, bool, Optional[Dict]]:
+    """Ask for the target translation language"""
+    if not session.get("zh_output"):
+        return _REPLY_NO_ZH_TRANSLATE
+    session["awaiting_translate_language"] = True
+    return _REPLY_ASK_TRANSLATE_LANG
+
+def handle_mail_command(session: Dict) -> Tuple[str, bool, Optional[Dict]]:
+    """Ask for the recipient email address"""
+    if not session.get("zh_output"):
+        return _REPLY_NO_ZH_MAIL
+    session["awaiting_email"] = True
+    return _REPLY_ASK_EMAIL
+
+def handle_modify_response(session: Dict, instruction: str, user_id: str = "unknown") -> Tuple[str, bool, Optional[Dict]]:
     """Process content modification"""
-    original_content = session.get('zh_output', '')
+    original_content = session.get("zh_output", '')
     # Processing content modification
     
     prompt = f"User instruction:\n{instruction}\n\nOriginal content:\n{original_content}"
-    new_content = call_zh(prompt, system_prompt=modify_prompt)
+    new_content, new_refs = call_zh(prompt, system_prompt=modify_prompt)
     
     # Content modified successfully
     
     session["zh_output"] = new_content
     session["awaiting_modify"] = False
+    session["show_edu_content"] = True
     
     # Clear any previous translation since the original has changed
     if "translated_output" in session:
@@ -229,21 +277,9 @@ def handle_modify_response(session: Dict, instruction: str) -> Tuple[str, bool,
         # Previous translation cleared after modification
     
     # Append new references to existing ones
-    new_refs = get_references()
-    if new_refs:
-        existing_refs = session.get("references", [])
-        # Combine existing and new references, removing duplicates based on URL
-        combined_refs = existing_refs.copy()
-        
-        for new_ref in new_refs:
-            # Check if this reference already exists (by URL)
-            if not any(existing_ref.get("url") == new_ref.get("url") for existing_ref in combined_refs):
-                combined_refs.append(new_ref)
-        
-        session["references"] = combined_refs
+    _append_refs(session, new_refs)
     
-    quick_reply = QuickReplyTemplates.create('EDU_ACTIONS')
-    return "✅ 內容已根據您的要求修改。", True, quick_reply
+    return _REPLY_MODIFIED
 
 def handle_translate_response(session: Dict, language: str, user_id: str = "unknown") -> Tuple[str, bool, Optional[Dict]]:
     """Process translation"""
@@ -251,40 +287,29 @@ def handle_translate_response(session: Dict, language: str, user_id: str = "unkn
     
     # No need to validate - Gemini supports all languages
     if not language or not language.strip():
-        quick_reply = {"items": create_quick_reply_items(EDU_LANGUAGES)}
-        return "請輸入或選擇您需要的翻譯語言：", False, quick_reply
+        return _REPLY_EMPTY_TRANSLATE_LANG
     
     # Block Taigi in education mode to prevent overloading the service
-    if language in ["台語", "臺語", "taiwanese", "taigi"]:
-        quick_reply = {"items": create_quick_reply_items(EDU_LANGUAGES)}
-        return "衛教模式不支援台語翻譯。請選擇其他語言，或使用醫療翻譯模式進行台語翻譯。", False, quick_reply
+    if language in TAIGI_LANGS:
+        return _REPLY_NO_TAIGI_IN_EDU
     
     # Use Gemini for all languages in edu mode
-    translated = call_translate(session["zh_output"], language)
-    gemini_called = True
+    zh_text = session["zh_output"]
+    translated, new_refs, gemini_called = _translate(
+        zh_text, language, use_cache=_is_common_topic_content(session, zh_text)
+    )
     
     # Append new references to existing ones for Gemini calls
-    new_refs = get_references()
-    if new_refs:
-        existing_refs = session.get("references", [])
-        # Combine existing and new references, removing duplicates based on URL
-        combined_refs = existing_refs.copy()
-        
-        for new_ref in new_refs:
-            # Check if this reference already exists (by URL)
-            if not any(existing_ref.get("url") == new_ref.get("url") for existing_ref in combined_refs):
-                combined_refs.append(new_ref)
-        
-        session["references"] = combined_refs
+    _append_refs(session, new_refs)
     
     session["translated_output"] = translated
     session["translated"] = True
     session["awaiting_translate_language"] = False
     session["last_translation_lang"] = language
     session["just_translated"] = True
+    session["show_edu_content"] = True
     
-    quick_reply = QuickReplyTemplates.create('EDU_ACTIONS_NO_MODIFY')
-    return f"🌐 翻譯完成（目標語言：{language}）。", gemini_called, quick_reply
+    return f"🌐 翻譯完成（目標語言：{language}）。", gemini_called, QR_EDU_ACTIONS_NO_MODIFY
 
 def handle_email_response(session: Dict, email: str, user_id: str = "unknown") -> Tuple[str, bool, Optional[Dict]]:
     """Process email sending"""
@@ -293,9 +318,7 @@ def handle_email_response(session: Dict, email: str, user_id: str = "unknown") -
         domain = validated_email.split("@")[1]
         
         # Check MX record
-        try:
-            dns.resolver.resolve(domain, "MX", lifetime=3)
-        except:
+        if not _has_mx_record(domain):
             return f"無法驗證 {domain} 的郵件伺服器。請確認 email 地址是否正確（例如：name@gmail.com）。", False, None
     
     except ValueError as e:
@@ -310,12 +333,157 @@ def handle_email_response(session: Dict, email: str, user_id: str = "unknown") -
         # Email R2 URL stored for logging
     
     if success:
-        quick_reply = QuickReplyTemplates.create('EDU_ACTIONS_NO_MODIFY')
-        return f"✅ 已成功寄出衛教內容至 {validated_email}", False, quick_reply
+        return f"✅ 已成功寄出衛教內容至 {validated_email}", False, QR_EDU_ACTIONS_NO_MODIFY
     else:
-        return "郵件寄送失敗。請檢查網路連線後再試一次。", False, None
+        return _REPLY_MAIL_FAILED
 
 # ============================================================
 # HELPER FUNCTIONS
 # ============================================================
 
+# MX lookups are cached per domain; repeat domains (gmail.com, ...) dominate
+MX_CACHE_TTL_SECONDS = 3600
+MX_CACHE_MAX_SIZE = 1024  # least recently checked domains are dropped beyond this
+# Large providers whose mail servers are not going away skip DNS entirely
+_KNOWN_MAIL_DOMAINS = frozenset((
+    "gmail.com", "googlemail.com", "outlook.com", "hotmail.com", "live.com",
+    "msn.com", "yahoo.com", "yahoo.com.tw", "icloud.com", "me.com",
+    "proton.me", "protonmail.com",
+))
+_mx_cache: "OrderedDict[str, float]" = OrderedDict()  # domain -> monotonic time of last successful lookup
+_mx_cache_lock = threading.Lock()  # webhooks check emails from several worker threads
+# Optional comma-separated nameservers (e.g. "1.1.1.1,8.8.8.8"); system default otherwise
+DNS_NAMESERVERS = [ns.strip() for ns in os.getenv("DNS_NAMESERVERS", "").split(",") if ns.strip()]
+_resolver = None  # dnspython is only needed for email checks, so load it on first use
+
+def _get_resolver():
+    """Create the shared DNS resolver on first use"""
+    global _resolver
+    if _resolver is None:
+        import dns.resolver
+        resolver = dns.resolver.Resolver()
+        if DNS_NAMESERVERS:
+            resolver.nameservers = DNS_NAMESERVERS
+        resolver.timeout = 1.0   # per nameserver attempt
+        resolver.lifetime = 2.0  # whole query, fail fast on bad domains
+        resolver.cache = dns.resolver.LRUCache(max_size=4096)  # honours record TTLs, incl. NXDOMAIN
+        _resolver = resolver
+    return _resolver
+
+def _has_mx_record(domain: str) -> bool:
+    """Check that the domain has an MX record, reusing recent successes"""
+    if domain in _KNOWN_MAIL_DOMAINS:
+        return True
+    
+    with _mx_cache_lock:
+        checked_at = _mx_cache.get(domain)
+        if checked_at is not None and time.monotonic() - checked_at < MX_CACHE_TTL_SECONDS:
+            _mx_cache.move_to_end(domain)
+            return True
+    
+    resolver = _get_resolver()
+    import dns.exception  # already loaded by dns.resolver
+    try:
+        resolver.resolve(domain, "MX")
+    except (dns.exception.DNSException, OSError):
+        return False
+    
+    with _mx_cache_lock:
+        _mx_cache[domain] = time.monotonic()
+        _mx_cache.move_to_end(domain)
+        if len(_mx_cache) > MX_CACHE_MAX_SIZE:
+            _mx_cache.popitem(last=False)
+    return True
+
+def _append_refs(session: Dict, refs: List[Dict]) -> None:
+    """Append references to the session, skipping URLs already present"""
+    if not refs:
+        return
+    
+    existing = session.setdefault("references", [])
+    seen_urls = {ref.get("url") for ref in existing}
+    for ref in refs:
+        url = ref.get("url")
+        if url not in seen_urls:
+            existing.append(ref)
+            seen_urls.add(url)
+
+# Quick-reply disease topics are requested by many users; their generated
+# content (with references) is cached so repeats skip the Gemini round-trip
+ZH_TOPIC_CACHE_TTL_SECONDS = 24 * 3600
+_COMMON_TOPICS = frozenset(topic.lower() for _, topic in COMMON_DISEASES)
+_zh_topic_cache = TTLCache(max_size=len(_COMMON_TOPICS), ttl_seconds=ZH_TOPIC_CACHE_TTL_SECONDS)  # topic -> (content, refs)
+
+def _generate_zh(topic: str) -> Tuple[str, List[Dict], bool]:
+    """Generate Chinese content, returning (content, references, gemini_called); common topics are cached"""
+    key = topic.lower()
+    if key not in _COMMON_TOPICS:
+        return call_zh(topic) + (True,)
+    
+    cached = _zh_topic_cache.get(key)
+    if cached is not None:
+        return cached[0], list(cached[1]), False
+    
+    zh_content, refs = call_zh(topic)
+    if not is_error_reply(zh_content):
+        _zh_topic_cache.set(key, (zh_content, refs))
+    return zh_content, list(refs), True
+
+# The cached common-topic content is often translated into the same language
+# again, so those translations are kept in a small LRU keyed by content.
+# Free-form topics and modified content are user-specific and not cached
+_translation_cache = TTLCache(max_size=256, ttl_seconds=24 * 3600)  # (content, language) -> (translated, refs)
+
+def _is_common_topic_content(session: Dict, zh_text: str) -> bool:
+    """True if zh_text is the unmodified cached content of a common topic"""
+    cached = _zh_topic_cache.get(session.get("last_topic", "").lower())
+    return cached is not None and cached[0] == zh_text
+
+def _translate(zh_text: str, language: str, use_cache: bool) -> Tuple[str, List[Dict], bool]:
+    """Translate content, returning (translated, references, gemini_called)"""
+    if not use_cache:
+        return call_translate(zh_text, language) + (True,)
+    
+    key = (zh_text, language)
+    cached = _translation_cache.get(key)
+    if cached is not None:
+        return cached[0], list(cached[1]), False
+    
+    translated, refs = call_translate(zh_text, language)
+    if not is_error_reply(translated):
+        _translation_cache.set(key, (translated, refs))
+    return translated, list(refs), True
+
+# ============================================================
+# DISPATCH TABLES
+# ============================================================
+
+# Awaiting-state handlers, checked in priority order
+_AWAIT_DISPATCH = (
+    ("awaiting_modify", handle_modify_response),
+    ("awaiting_translate_language", handle_translate_response),
+    ("awaiting_email", handle_email_response),
+)
+
+# Top-level commands: token -> (handler, requires_started, requires_no_mode)
+_COMMAND_DISPATCH: Dict[str, Tuple[Callable, bool, bool]] = {}
+for _cmd in new_commands:
+    _COMMAND_DISPATCH[_cmd] = (handle_new_command, False, False)
+for _cmd in speak_commands:
+    _COMMAND_DISPATCH[_cmd] = (handle_speak_command, True, False)
+for _cmd in edu_commands:
+    _COMMAND_DISPATCH[_cmd] = (handle_edu_command, True, True)
+for _cmd in chat_commands:
+    _COMMAND_DISPATCH[_cmd] = (handle_chat_command, True, True)
+
+# Education-mode commands, consulted after the awaiting states
+_EDU_COMMAND_DISPATCH: Dict[str, Callable] = {}
+for _cmd in modify_commands:
+    _EDU_COMMAND_DISPATCH[_cmd] = handle_modify_command
+for _cmd in translate_commands:
+    _EDU_COMMAND_DISPATCH[_cmd] = handle_translate_command
+for _cmd in mail_commands:
+    _EDU_COMMAND_DISPATCH[_cmd] = handle_mail_command
+
+# Longest command token; anything longer skips the dispatch lookups
+_MAX_COMMAND_LEN = max(map(len, [*_COMMAND_DISPATCH, *_EDU_COMMAND_DISPATCH]))
@@ -1,7 +1,19 @@
 from utils.email_service import send_email
 from utils.r2_service import get_r2_service
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from models.email_log import EmailLog
+from utils import logger_config as log
+from utils.logger_config import LogPrefix
+
+__all__ = ["send_last_txt_email"]
+
+# Archiving the email to R2 runs alongside the SMTP send, so the user waits
+# for the slower of the two instead of both in sequence
+_upload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email-upload")
+# Once the email is out, wait at most this long for the archive link; a slow
+# R2 upload finishes in the background and the chat log just omits the URL
+R2_UPLOAD_WAIT_SECONDS = 2.0
 
 def send_last_txt_email(user_id: str, to_email: str, session: dict) -> tuple[bool, str]:
     zh = session.get("zh_output")
@@ -10,23 +22,21 @@ def send_last_txt_email(user_id: str, to_email: str, session: dict) -> tuple[boo
     topic = session.get("last_topic", "未知主題")
     references = session.get("references") or []
 
-    # Debug output removed to reduce log verbosity
+    if not zh:
+        return False, None  # No content at all to send
 
     # Compose reference list as plain text (for email)
     ref_str = ""
     if references:
         try:
-            ref_str = "\n\n參考來源：\n" + "\n".join([
+            ref_str = "\n\n參考來源：\n" + "\n".join(
                 f"{i+1}. {ref.get('title','')}: {ref.get('url','')}"
                 for i, ref in enumerate(references)
                 if isinstance(ref, dict)
-            ])
+            )
         except Exception as e:
             ref_str = "\n\n參考來源： (format error)\n"
 
-    if not zh:
-        return False  # No content at all to send
-
     # Compose email body
     if translated:
         content = f"📄 原文：\n{zh}\n\n🌐 譯文：\n{translated}{ref_str}"
@@ -37,7 +47,26 @@ def send_last_txt_email(user_id: str, to_email: str, session: dict) -> tuple[boo
 
     # Email content prepared successfully
     
-    # Upload email content to R2
+    # Upload email content to R2 while the email is being sent
+    upload = _upload_executor.submit(
+        _upload_email_log, user_id, to_email, subject, content,
+        topic, zh, translated, translated_lang, references
+    )
+    
+    # Send email
+    success = send_email(to_email, subject, content)
+    try:
+        r2_url = upload.result(timeout=R2_UPLOAD_WAIT_SECONDS)
+    except TimeoutError:
+        r2_url = None
+        log.warn(LogPrefix.EMAIL, "R2 upload still running, replying without archive link")
+    
+    return success, r2_url
+
+
+def _upload_email_log(user_id: str, to_email: str, subject: str, content: str, topic: str,
+                      zh: str, translated, translated_lang, references) -> str:
+    """Upload the sent email content to R2 and return its link"""
     r2_url = None
     try:
         r2_service = get_r2_service()
@@ -62,7 +91,7 @@ def send_last_txt_email(user_id: str, to_email: str, session: dict) -> tuple[boo
             
             # Upload to R2 with email indicator in filename
             filename = f"{user_id}-email-{timestamp}.txt"
-            print(f"[EMAIL] Uploading file: {filename} to folder: text/{user_id}")
+            log.debug(LogPrefix.EMAIL, f"Uploading file: {filename} to folder: text/{user_id}")
             result = r2_service.upload_text_file(
                 email_log_content, 
                 filename, 
@@ -70,14 +99,11 @@ def send_last_txt_email(user_id: str, to_email: str, session: dict) -> tuple[boo
             )
             # Upload completed
             r2_url = result.get('webViewLink')
-            print(f"[EMAIL] Content uploaded to R2: {r2_url}")
+            log.debug(LogPrefix.EMAIL, f"Content uploaded to R2: {r2_url}")
     except Exception as e:
-        print(f"[EMAIL] Failed to upload to R2: {e}")
+        log.error(LogPrefix.EMAIL, "Failed to upload to R2", e)
         import traceback
         traceback.print_exc()
-        # Continue with email sending even if R2 upload fails
+        # The email is still sent even if R2 upload fails
     
-    # Send email
-    success = send_email(to_email, subject, content)
-    
-    return success, r2_url
+    return r2_url
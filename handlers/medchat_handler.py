@@ -1,17 +1,41 @@
-from services.gemini_service import plainify, confirm_translate
+import re
+
+from services.gemini_service import plainify, confirm_translate, is_error_reply
 from services.taigi_service import translate_to_taigi, synthesize_taigi
-from utils.language_utils import normalize_language_input
+from utils.language_utils import normalize_language_input, TAIGI_LANGS
 from utils.logging import log_chat
 from utils.command_sets import create_quick_reply_items, COMMON_LANGUAGES, CHAT_TTS_OPTIONS
+from utils.ttl_cache import TTLCache
 
 __all__ = ["handle_medchat"]
 
+# Fixed button sets, built once; LINE's QuickReply copies the items on send
+QR_LANGUAGES = {"items": create_quick_reply_items(COMMON_LANGUAGES)}
+QR_TTS = {"items": create_quick_reply_items(CHAT_TTS_OPTIONS)}
+
+# Common clinical phrases recur across users, so recent
+# plain-language rewrites and their translations are reused
+_plainify_cache = TTLCache(max_size=2048, ttl_seconds=24 * 3600)  # raw -> plain_zh
+_confirm_cache = TTLCache(max_size=2048, ttl_seconds=24 * 3600)   # (plain_zh, lang) -> translated
+
+# Very short, all-Chinese input (頭痛, 肚子痛, 謝謝) has no jargon or
+# abbreviations for plainify to expand, so it is translated as typed
+_SHORT_ZH_RE = re.compile(r"[\u4e00-\u9fff]{1,8}")
+
+def _cached_call(cache: TTLCache, key, func, *args) -> tuple[str, bool]:
+    """Return (result, gemini_called), caching successful results only"""
+    result = cache.get(key)
+    if result is not None:
+        return result, False
+    result = func(*args)
+    if not is_error_reply(result):
+        cache.set(key, result)
+    return result, True
+
 def _looks_like_language(token: str) -> bool:
     """Heuristic: short word (≤15 chars) w/o punctuation → language name."""
-    return (
-        1 <= len(token) <= 15 and
-        all(ch.isalpha() or "\u4e00" <= ch <= "\u9fff" for ch in token)
-    )
+    # CJK ideographs are alphabetic too, so one C-level isalpha() covers both
+    return 1 <= len(token) <= 15 and token.isalpha()
 
 
 def handle_medchat(user_id: str, raw: str, session: dict) -> tuple[str, bool, dict]:
@@ -30,10 +54,7 @@ def handle_medchat(user_id: str, raw: str, session: dict) -> tuple[str, bool, di
     # 1. Waiting for user to supply the target language -----------------
     if session.get("awaiting_chat_language"):
         if not _looks_like_language(raw):
-            quick_reply = {
-                "items": create_quick_reply_items(COMMON_LANGUAGES)
-            }
-            return "請先選擇或輸入您需要翻譯的目標語言：", False, quick_reply
+            return "請先選擇或輸入您需要翻譯的目標語言：", False, QR_LANGUAGES
 
         # Normalize the language input
         normalized_lang = normalize_language_input(raw)
@@ -49,7 +70,7 @@ def handle_medchat(user_id: str, raw: str, session: dict) -> tuple[str, bool, di
             user_id,
             log_message,
             f"目標語言已設定為「{normalized_lang}」",
-            session,
+            dict(session),  # snapshot; written later on the logging loop
             action_type="sync reply",
             gemini_call="no"
         )
@@ -62,25 +83,27 @@ def handle_medchat(user_id: str, raw: str, session: dict) -> tuple[str, bool, di
         # Ensure session remains active
         session["started"] = True
         session["mode"] = "chat"
-        quick_reply = {
-            "items": create_quick_reply_items(COMMON_LANGUAGES)
-        }
-        return "尚未設定翻譯語言。請選擇或輸入您需要的目標語言：", False, quick_reply
+        return "尚未設定翻譯語言。請選擇或輸入您需要的目標語言：", False, QR_LANGUAGES
 
     # 3. Plain‑ify Chinese, then translate + confirmation --------------
-    plain_zh = plainify(raw)
+    if _SHORT_ZH_RE.fullmatch(raw):
+        plain_zh, plainify_called = raw, False
+    else:
+        plain_zh, plainify_called = _cached_call(_plainify_cache, raw, plainify, raw)
     
     # Check if target language is Taiwanese
     target_lang = session["chat_target_lang"]
-    if target_lang in ["台語", "臺語", "taiwanese", "taigi"]:
+    if target_lang.lower() in TAIGI_LANGS:
         # Use Taigi service for Taiwanese
         translated = translate_to_taigi(plain_zh)
         gemini_called = "no"
         # Don't auto-generate TTS for Taigi - wait for speak command
     else:
         # Use Gemini for other languages
-        translated = confirm_translate(plain_zh, target_lang)
-        gemini_called = "yes"
+        translated, translate_called = _cached_call(
+            _confirm_cache, (plain_zh, target_lang), confirm_translate, plain_zh, target_lang
+        )
+        gemini_called = "yes" if plainify_called or translate_called else "no"
 
     # ── stash for Drive log (upload_gemini_log looks for these keys) ──
     session["zh_output"]         = plain_zh
@@ -92,19 +115,15 @@ def handle_medchat(user_id: str, raw: str, session: dict) -> tuple[str, bool, di
         f"{plain_zh}\n\n"
         f"{translated}"
 )
-    
-    quick_reply = {
-        "items": create_quick_reply_items(CHAT_TTS_OPTIONS)
-    }
 
     # Log interaction --------------------------------------------------
     log_chat(
         user_id,
         raw,
         reply_text,
-        session,
+        dict(session),  # snapshot; written later on the logging loop
         action_type="medchat",
         gemini_call=gemini_called,
     )
 
-    return reply_text, gemini_called == "yes", quick_reply
+    return reply_text, gemini_called == "yes", QR_TTS
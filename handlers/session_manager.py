@@ -2,67 +2,88 @@
 Session Manager - Thread-Safe User Session Management
 """
 import threading
-from datetime import datetime, timedelta
-from typing import Dict
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
 
 # Configuration
 SESSION_EXPIRY_HOURS = 24
+SESSION_EXPIRY_SECONDS = SESSION_EXPIRY_HOURS * 3600
+CLEANUP_BATCH_SIZE = 64
+MAX_SESSIONS = 10000  # least recently used users are evicted beyond this
+
+class _UserEntry:
+    """Session, last access time and lock for one user"""
+    __slots__ = ("session", "last_access", "lock")
+
+    def __init__(self):
+        self.session: Dict = {}
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
 
 # Storage
-_sessions: Dict[str, Dict] = {}
-_session_last_access: Dict[str, datetime] = {}
-_session_locks: Dict[str, threading.RLock] = {}
-_global_lock = threading.RLock()
+_users: "OrderedDict[str, _UserEntry]" = OrderedDict()  # oldest access first
+_global_lock = threading.Lock()  # guards _users only; held for O(1) work, never re-entered
+
+def _get_entry(user_id: str) -> _UserEntry:
+    """Return the user's entry, creating it if needed (caller holds _global_lock)"""
+    entry = _users.get(user_id)
+    if entry is None:
+        while len(_users) >= MAX_SESSIONS:
+            _users.popitem(last=False)
+        entry = _users[user_id] = _UserEntry()
+    return entry
+
+def _touch_entry(user_id: str) -> _UserEntry:
+    """Get or create the user's entry and mark it most recently used"""
+    with _global_lock:
+        entry = _get_entry(user_id)
+        entry.last_access = time.monotonic()
+        _users.move_to_end(user_id)
+        return entry
 
 def get_user_session(user_id: str) -> Dict:
     """Get or create a user session"""
-    with _global_lock:
-        if user_id not in _sessions:
-            # Create lock first to ensure atomicity
-            new_lock = threading.RLock()
-            _session_locks[user_id] = new_lock
-            _sessions[user_id] = {}
-        
-        _session_last_access[user_id] = datetime.now()
-        return _sessions[user_id]
+    return _touch_entry(user_id).session
 
-def get_session_lock(user_id: str) -> threading.RLock:
-    """Get the lock for a specific user session"""
-    with _global_lock:
-        return _session_locks.get(user_id, _global_lock)
+def get_session_and_lock(user_id: str) -> Tuple[Dict, threading.Lock]:
+    """Get or create a user session together with the lock that guards it"""
+    # Both come from the same entry, so an eviction between two separate
+    # lookups can't hand back a lock for a different session dict
+    entry = _touch_entry(user_id)
+    return entry.session, entry.lock
 
 def reset_user_session(user_id: str) -> None:
     """Reset a user's session to initial state"""
     with _global_lock:
-        # Ensure lock exists first
-        if user_id not in _session_locks:
-            _session_locks[user_id] = threading.RLock()
-            
-        _sessions[user_id] = {}
-        _session_last_access[user_id] = datetime.now()
+        entry = _get_entry(user_id)
+        entry.session = {}
+        entry.last_access = time.monotonic()
+        _users.move_to_end(user_id)
 
 def cleanup_expired_sessions() -> int:
     """Remove sessions that haven't been accessed in SESSION_EXPIRY_HOURS"""
-    with _global_lock:
-        now = datetime.now()
-        expiry_threshold = timedelta(hours=SESSION_EXPIRY_HOURS)
-        
-        expired_users = [
-            user_id for user_id, last_access in _session_last_access.items()
-            if now - last_access > expiry_threshold
-        ]
-        
-        for user_id in expired_users:
-            _sessions.pop(user_id, None)
-            _session_last_access.pop(user_id, None)
-            _session_locks.pop(user_id, None)
-        
-        return len(expired_users)
+    now = time.monotonic()
+    removed = 0
+    
+    # _users is ordered by last access, so expired users form a prefix.
+    # Pop them in small batches so incoming messages aren't stalled behind a
+    # large sweep, and stop at the first user that is still active
+    while True:
+        with _global_lock:
+            for _ in range(CLEANUP_BATCH_SIZE):
+                if not _users:
+                    return removed
+                oldest = next(iter(_users.values()))
+                if now - oldest.last_access <= SESSION_EXPIRY_SECONDS:
+                    return removed
+                _users.popitem(last=False)
+                removed += 1
 
 def get_session_count() -> int:
     """Get current number of active sessions"""
     with _global_lock:
-        return len(_sessions)
+        return len(_users)
 
 # Compatibility alias
-get_user_session_sync = get_user_session
\ No newline at end of file
+get_user_session_sync = get_user_session
@@ -3,7 +3,6 @@ Mededbot Main Application
 """
 import os
 import sys
-import io
 import asyncio
 from datetime import datetime
 from contextlib import asynccontextmanager
@@ -11,7 +10,6 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, Response, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from routes.webhook import webhook_router
@@ -119,10 +117,15 @@ async def health():
         "timestamp": datetime.now().isoformat()
     }
 
+# Static body: monitors hit /ping constantly, so skip per-call serialization
+_PING_BODY = b'{"status":"ok"}'
+
 @app.api_route("/ping", methods=["GET", "HEAD"])
-def ping():
+async def ping():
     """Simple ping endpoint for monitoring"""
-    return {"status": "ok"}
+    return Response(content=_PING_BODY, media_type="application/json")
+
+_AUDIO_CACHE_HEADERS = {"Cache-Control": "public, max-age=86400, immutable"}
 
 @app.get("/audio/{filename}")
 async def get_audio(filename: str):
@@ -137,7 +140,10 @@ async def get_audio(filename: str):
             raise HTTPException(404, "File not found")
         
         data, content_type = result
-        return StreamingResponse(io.BytesIO(data), media_type=content_type)
+        # Already fully in memory: send it in one body with Content-Length.
+        # Each TTS file gets a fresh user id + timestamp name, and memory
+        # storage keeps files for 24h
+        return Response(content=data, media_type=content_type, headers=_AUDIO_CACHE_HEADERS)
     except ValueError:
         raise HTTPException(400, "Invalid filename")
 
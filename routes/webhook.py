@@ -7,10 +7,17 @@ from linebot import WebhookHandler
 import os
 import asyncio
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 webhook_router = APIRouter()
 handler = WebhookHandler(os.getenv("LINE_CHANNEL_SECRET"))
 
+# Dedicated pool for the sync LINE handlers. Their work is I/O-bound (Gemini,
+# TTS, SMTP, DNS), so size it well past the CPU count instead of sharing the
+# small default asyncio.to_thread pool (min(32, cpu + 4) workers)
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32"))
+_webhook_executor = ThreadPoolExecutor(max_workers=WEBHOOK_WORKERS, thread_name_prefix="webhook")
+
 @webhook_router.post("/webhook")
 async def webhook(request: Request, x_line_signature: str = Header(None)):
     # Add timeout protection to prevent hanging webhooks
@@ -22,8 +29,10 @@ async def webhook(request: Request, x_line_signature: str = Header(None)):
             #print("[WEBHOOK] Raw body:", body_str)
             #print("[WEBHOOK] Signature:", x_line_signature)
             
-            # Handle synchronously - FastAPI can manage this
-            handler.handle(body_str, x_line_signature)
+            # Run the sync LINE handlers (Gemini, TTS, SMTP) in a worker thread
+            # so one slow reply doesn't block the event loop for every user
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(_webhook_executor, handler.handle, body_str, x_line_signature)
             return "OK"
         
         return await asyncio.wait_for(handle_request(), timeout=48.0)
@@ -3,10 +3,9 @@ Gemini AI Service
 """
 import os
 import time
-import threading
-from concurrent.futures import TimeoutError, ThreadPoolExecutor
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
+import httpx
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -31,15 +30,20 @@ MAX_RETRIES = 2
 RETRY_DELAY = 3
 MODEL_NAME = "gemini-2.5-flash"
 
-# Shared resources
-_client = genai.Client(api_key=API_KEY)
+# Shared resources. The timeout is enforced by the HTTP client (milliseconds),
+# so calls run on the caller's thread and a timed-out request is really aborted
+_client = genai.Client(
+    api_key=API_KEY,
+    http_options=types.HttpOptions(timeout=API_TIMEOUT_SECONDS * 1000)
+)
 _tools = [types.Tool(google_search=types.GoogleSearch())]
-_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='gemini')
-_last_response_lock = threading.Lock()
-_last_response = None
 
 def _call_genai(user_text: str, sys_prompt: Optional[str] = None, temp: float = 0.25) -> str:
     """Internal function to call Gemini API"""
+    return _generate(user_text, sys_prompt, temp)[0]
+
+def _generate(user_text: str, sys_prompt: Optional[str] = None, temp: float = 0.25) -> Tuple[str, Optional[types.GenerateContentResponse]]:
+    """Call Gemini API and return the text together with the raw response"""
     # Build request
     contents = [
         types.Content(
@@ -66,54 +70,51 @@ def _call_genai(user_text: str, sys_prompt: Optional[str] = None, temp: float =
         try:
             # Call with circuit breaker
             def api_call():
-                future = _executor.submit(
-                    _client.models.generate_content,
+                return _client.models.generate_content(
                     model=MODEL_NAME,
                     contents=contents,
                     config=config,
                 )
-                response = future.result(timeout=API_TIMEOUT_SECONDS)
-                
-                # Store response
-                with _last_response_lock:
-                    global _last_response
-                    _last_response = response
-                
-                return response
             
             response = gemini_circuit_breaker.call(api_call)
             
             # Extract text
             if response and response.candidates and response.candidates[0].content.parts:
-                return response.candidates[0].content.parts[0].text
-            return ""
+                return response.candidates[0].content.parts[0].text, response
+            return "", response
             
         except CircuitBreakerError:
-            return "⚠️ AI 服務暫時過載，請稍等片刻後再試。"
-        except TimeoutError:
+            return "⚠️ AI 服務暫時過載，請稍等片刻後再試。", None
+        except httpx.TimeoutException:
             if attempt < MAX_RETRIES:
                 time.sleep(RETRY_DELAY)
                 continue
-            return "⚠️ AI 服務響應超時，請稍後再試。"
+            return "⚠️ AI 服務響應超時，請稍後再試。", None
         except Exception as e:
             if attempt < MAX_RETRIES:
                 time.sleep(RETRY_DELAY)
                 continue
             print(f"[GEMINI] API error: {e}")
-            return "⚠️ AI 服務暫時無法使用，請稍後再試。"
+            return "⚠️ AI 服務暫時無法使用，請稍後再試。", None
     
-    return "⚠️ AI 服務暫時無法使用，請稍後再試。"
+    return "⚠️ AI 服務暫時無法使用，請稍後再試。", None
+
+def is_error_reply(text: str) -> bool:
+    """True for empty output or one of the ⚠️ service error messages above"""
+    return not text or text.startswith("⚠️")
 
 @rate_limit(gemini_limiter, key_func=lambda *args, **kwargs: "global")
-def call_zh(prompt: str, system_prompt: str = zh_prompt) -> str:
-    """Generate Chinese health education content"""
-    return _call_genai(prompt, sys_prompt=system_prompt, temp=0.25)
+def call_zh(prompt: str, system_prompt: str = zh_prompt) -> Tuple[str, List[Dict[str, str]]]:
+    """Generate Chinese health education content and its references"""
+    text, response = _generate(prompt, sys_prompt=system_prompt, temp=0.25)
+    return text, _extract_references(response)
 
 @rate_limit(gemini_limiter, key_func=lambda *args, **kwargs: "global")
-def call_translate(zh_text: str, target_lang: str) -> str:
-    """Translate Chinese text to target language"""
+def call_translate(zh_text: str, target_lang: str) -> Tuple[str, List[Dict[str, str]]]:
+    """Translate Chinese text to target language, returning its references too"""
     sys_prompt = translate_prompt_template.format(lang=target_lang)
-    return _call_genai(zh_text, sys_prompt=sys_prompt, temp=0.25)
+    text, response = _generate(zh_text, sys_prompt=sys_prompt, temp=0.25)
+    return text, _extract_references(response)
 
 @rate_limit(gemini_limiter, key_func=lambda *args, **kwargs: "global")
 def plainify(text: str) -> str:
@@ -130,16 +131,13 @@ def confirm_translate(plain_zh: str, target_lang: str) -> str:
     user_input = f"Please translate for the patient: {plain_zh}"
     return _call_genai(user_input, sys_prompt=sys_prompt, temp=0.2)
 
-def get_references() -> List[Dict[str, str]]:
-    """Extract references from last Gemini response"""
+def _extract_references(response) -> List[Dict[str, str]]:
+    """Extract references from the grounding metadata of a Gemini response"""
     try:
-        with _last_response_lock:
-            last_response = _last_response
-        
-        if not last_response or not last_response.candidates:
+        if not response or not response.candidates:
             return []
         
-        candidate = last_response.candidates[0]
+        candidate = response.candidates[0]
         grounding = getattr(candidate, "grounding_metadata", None)
         if not grounding:
             return []
@@ -2,19 +2,26 @@
 Centralised lists of recognised command words.
 Edit here if you want to add synonyms.
 """
+import sys
+
+
+def _commands(*words):
+    """Build a command set matched against lowercased input"""
+    return frozenset(sys.intern(word.lower()) for word in words)
+
 
 # conversation control
-new_commands       = {"new", "開始"}
+new_commands       = _commands("new", "開始")
 
 # mode selection *after* new
-edu_commands       = {"ed", "education", "衛教"}
-chat_commands      = {"chat", "聊天"}
+edu_commands       = _commands("ed", "education", "衛教")
+chat_commands      = _commands("chat", "聊天")
 
 # education-branch commands
-modify_commands    = {"modify", "修改"}
-translate_commands = {"translate", "翻譯", "trans"}
-mail_commands      = {"mail", "寄送"}
-speak_commands = {"speak", "朗讀"}
+modify_commands    = _commands("modify", "修改")
+translate_commands = _commands("translate", "翻譯", "trans")
+mail_commands      = _commands("mail", "寄送")
+speak_commands     = _commands("speak", "朗讀")
 
 
 def create_quick_reply_items(options):
@@ -7,6 +7,9 @@ import os
 import sys
 from typing import Optional
 
+# Debug output is opt-in via DEBUG=true; read once so disabled calls are cheap
+DEBUG_ENABLED = os.getenv("DEBUG", "").lower() == "true"
+
 # Log levels
 class LogLevel:
     ERROR = "ERROR"
@@ -65,7 +68,7 @@ def log(level: str, prefix: str, message: str, error: Optional[Exception] = None
 
 def debug(prefix: str, message: str):
     """Log debug message"""
-    if os.getenv("DEBUG", "").lower() == "true":
+    if DEBUG_ENABLED:
         log(LogLevel.DEBUG, prefix, message)
 
 def info(prefix: str, message: str):
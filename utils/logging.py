@@ -11,11 +11,37 @@ from concurrent.futures import ThreadPoolExecutor
 from utils.database import log_chat_to_db, log_tts_to_db
 from utils.r2_service import upload_gemini_log as _upload_gemini_log_r2, get_r2_service
 from utils.retry_utils import exponential_backoff, RetryError
+from utils.language_utils import TAIGI_LANGS
 
 # Global thread pool executor to limit thread creation
 # This prevents unlimited thread spawning that could cause resource exhaustion
 _logging_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="logging-")
 
+# Long-lived event loop on a daemon thread that drains log coroutines queued
+# from sync handler threads, instead of spinning up a fresh loop per entry
+_log_loop = None
+_log_loop_lock = threading.Lock()
+
+
+def _get_log_loop():
+    """Return the background logging loop, starting it on first use"""
+    global _log_loop
+    if _log_loop is None:
+        with _log_loop_lock:
+            if _log_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="logging-loop", daemon=True).start()
+                _log_loop = loop
+    return _log_loop
+
+
+def _submit_log(coro, on_done=None):
+    """Queue a logging coroutine on the background loop without waiting for it"""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_log_loop())
+    if on_done:
+        future.add_done_callback(on_done)
+    return future
+
 
 async def _async_log_chat(user_id, message, reply, session, action_type=None, gemini_call=None, gemini_output_url=None):
     """
@@ -30,7 +56,7 @@ async def _async_log_chat(user_id, message, reply, session, action_type=None, ge
     # Language logging removed - included in DB log
     
     # Only upload to R2 if no URL was provided
-    if not drive_url and (gemini_call == "yes" or (language and language in ["台語", "臺語", "taiwanese", "taigi"])):
+    if not drive_url and (gemini_call == "yes" or (language and language.lower() in TAIGI_LANGS)):
         try:
             # Run R2 upload in bounded thread pool since it's sync
             loop = asyncio.get_event_loop()
@@ -255,74 +281,37 @@ async def _async_upload_voicemail(local_path: str, user_id: str, transcription:
 def log_chat_sync(user_id, message, reply, session, action_type=None, gemini_call=None, gemini_output_url=None):
     """
     Synchronous wrapper for log_chat for use in sync contexts.
-    Handles both cases: with and without existing event loop.
+    Queues the entry on the background logging loop and returns immediately.
+    The entry is written later, so callers pass a snapshot of the session
+    (dict(session)) taken while they hold the user's lock.
     """
-    # Sync wrapper for log_chat
-    
-    def _worker():
+    def _on_done(future):
         try:
-            # Starting async chat log
-            # Try to get existing event loop
-            try:
-                loop = asyncio.get_running_loop()
-                # If we're here, we're in an async context but called from sync code
-                # This shouldn't happen with our current fix, but handle it anyway
-                # Sync function called with active event loop
-                # Create task in existing loop
-                future = asyncio.run_coroutine_threadsafe(
-                    _async_log_chat(user_id, message, reply, session, action_type, gemini_call, gemini_output_url),
-                    loop
-                )
-                success = future.result(timeout=30)
-            except RuntimeError:
-                # No event loop, create one
-                success = asyncio.run(_async_log_chat(user_id, message, reply, session, action_type, gemini_call, gemini_output_url))
-            
-            if success:
-                # Chat logging completed
-                pass
-            else:
+            if not future.result():
                 print(f"[LOG] Chat logging failed")
         except Exception as e:
             print(f"[LOG] Chat logging thread failed: {e}")
-            import traceback
-            traceback.print_exc()
+            traceback.print_exception(type(e), e, e.__traceback__)
     
-    # Use bounded thread pool executor instead of unlimited threading
-    _logging_executor.submit(_worker)
+    _submit_log(
+        _async_log_chat(user_id, message, reply, session, action_type, gemini_call, gemini_output_url),
+        _on_done
+    )
 
 
 def log_tts_async(user_id, text, audio_path, audio_url):
     """
     Fire-and-forget async logging for TTS generation with Drive upload.
-    Handles both cases: with and without existing event loop.
+    Queues the entry on the background logging loop and returns immediately.
     """
-    # Fire-and-forget TTS logging
-    
-    def _worker():
+    def _on_done(future):
         try:
-            # Starting TTS logging and upload
-            # Try to get existing event loop
-            try:
-                loop = asyncio.get_running_loop()
-                # Sync function called with active event loop
-                # Create task in existing loop
-                future = asyncio.run_coroutine_threadsafe(
-                    _log_tts_internal(user_id, text, audio_path, audio_url),
-                    loop
-                )
-                future.result(timeout=30)
-            except RuntimeError:
-                # No event loop, create one
-                asyncio.run(_log_tts_internal(user_id, text, audio_path, audio_url))
-            # TTS logging completed
+            future.result()
         except Exception as e:
             print(f"[TTS] Logging thread failed: {e}")
-            import traceback
-            traceback.print_exc()
+            traceback.print_exception(type(e), e, e.__traceback__)
     
-    # Use bounded thread pool executor instead of unlimited threading
-    _logging_executor.submit(_worker)
+    _submit_log(_log_tts_internal(user_id, text, audio_path, audio_url), _on_done)
 
 
 def upload_voicemail_sync(local_path: str, user_id: str, transcription: str = None, translation: str = None) -> str:
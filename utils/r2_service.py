@@ -37,7 +37,12 @@ class R2Service:
             aws_secret_access_key=self.secret_key,
             config=Config(
                 signature_version='s3v4',
-                region_name='auto'
+                region_name='auto',
+                # One pooled, keep-alive client serves every upload thread
+                # (logging, email, TTS), so reuse connections and retry briefly
+                max_pool_connections=32,
+                tcp_keepalive=True,
+                retries={'max_attempts': 2, 'mode': 'standard'}
             )
         )
     
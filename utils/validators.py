@@ -11,13 +11,20 @@ MAX_FILENAME_LENGTH = 255
 MAX_EMAIL_LENGTH = 254
 ALLOWED_AUDIO_EXTENSIONS = {'.wav', '.m4a', '.mp3', '.ogg'}
 
+# Precompiled patterns
+_USER_ID_RE = re.compile(r'^U[0-9a-fA-F]{32}$')
+_FILENAME_UNSAFE_RE = re.compile(r'[^\w\s.-]')
+_MULTI_DOT_RE = re.compile(r'\.+')
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')  # RFC 5322 simplified, used with fullmatch
+_LANGUAGE_CODE_RE = re.compile(r'^[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ffa-zA-Z]{1,20}(-[a-zA-Z]{2,20})?$')
+
 def sanitize_user_id(user_id: str) -> str:
     """Sanitize and validate LINE user ID"""
     if not user_id:
         raise ValueError("User ID cannot be empty")
     
     # LINE user IDs start with 'U' followed by 32 hex characters
-    if not re.match(r'^U[0-9a-fA-F]{32}$', user_id):
+    if not _USER_ID_RE.match(user_id):
         raise ValueError("Invalid LINE user ID format")
     
     return user_id
@@ -31,8 +38,8 @@ def sanitize_filename(filename: str) -> str:
     filename = os.path.basename(filename)
     
     # Remove dangerous characters
-    filename = re.sub(r'[^\w\s.-]', '', filename)
-    filename = re.sub(r'\.+', '.', filename)  # Prevent multiple dots
+    filename = _FILENAME_UNSAFE_RE.sub('', filename)
+    filename = _MULTI_DOT_RE.sub('.', filename)  # Prevent multiple dots
     
     # Normalize unicode
     filename = unicodedata.normalize('NFKD', filename)
@@ -54,17 +61,12 @@ def validate_email(email: str) -> str:
     if not email:
         raise ValueError("Email cannot be empty")
     
-    # Basic email regex (RFC 5322 simplified)
-    email_pattern = re.compile(
-        r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    )
-    
     email = email.strip().lower()
     
     if len(email) > MAX_EMAIL_LENGTH:
         raise ValueError(f"Email too long (max {MAX_EMAIL_LENGTH} characters)")
     
-    if not email_pattern.match(email):
+    if not _EMAIL_RE.fullmatch(email):
         raise ValueError("Invalid email format")
     
     # Prevent email header injection
@@ -95,7 +97,7 @@ def validate_language_code(lang_code: str) -> str:
     
     # Allow Chinese/Japanese/Korean characters and common formats
     # Examples: "日文", "英文", "en", "en-US", "chinese"
-    if not re.match(r'^[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ffa-zA-Z]{1,20}(-[a-zA-Z]{2,20})?$', lang_code):
+    if not _LANGUAGE_CODE_RE.match(lang_code):
         raise ValueError("Invalid language code format")
     
     # Don't lowercase if it contains non-ASCII characters